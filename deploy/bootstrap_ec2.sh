@@ -22,6 +22,9 @@ server {
     proxy_set_header X-Real-IP $remote_addr;
     proxy_set_header X-Forwarded-For $proxy_add_x_forwarded_for;
     proxy_set_header X-Forwarded-Proto $scheme;
+    # Let Server-Sent Events (/api/stream) through unbuffered
+    proxy_buffering off;
+    proxy_read_timeout 1h;
   }
 }
 CONF
@@ -38,7 +41,7 @@ After=network.target
 User=ec2-user
 WorkingDirectory=/opt/machinery-enrichment
 Environment="PATH=/opt/machinery-enrichment/.venv/bin"
-ExecStart=/opt/machinery-enrichment/.venv/bin/gunicorn -w 3 -b 127.0.0.1:8000 web_dashboard.app:app
+ExecStart=/opt/machinery-enrichment/.venv/bin/gunicorn -w 3 -k gthread --threads 16 -b 127.0.0.1:8000 web_dashboard.app:app
 Restart=always
 
 [Install]
@@ -1,10 +1,80 @@
-import json
-from .schema import SCORECARD_SCHEMA
-from .prompt import SYSTEM_PROMPT
-from .openai_client import build_payload, create_response, extract_output_text
+import json, time
+from .schema import SCORECARD_SCHEMA, TRIAGE_SCHEMA
+from .prompt import SYSTEM_PROMPT, TRIAGE_PROMPT
+from .openai_client import build_payload, create_response, extract_output_text, TRIAGE_MODEL
 
 
-async def enrich_one(company_name: str, address: str, website: str | None, phone: str | None = None) -> dict:
+class EnrichStats:
+    """Per-stage call counts, latency and token usage for one batch."""
+
+    STAGES = ("triage", "full")
+
+    def __init__(self):
+        self.calls = {s: 0 for s in self.STAGES}
+        self.seconds = {s: 0.0 for s in self.STAGES}
+        self.tokens = {s: 0 for s in self.STAGES}
+        self.escalated = 0
+        self.screened_out = 0
+
+    def record(self, stage: str, seconds: float, resp: dict) -> None:
+        usage = resp.get("usage") or {}
+        self.calls[stage] += 1
+        self.seconds[stage] += seconds
+        self.tokens[stage] += int(usage.get("total_tokens") or 0)
+
+    def summary(self) -> dict:
+        out = {"escalated": self.escalated, "screened_out": self.screened_out}
+        for s in self.STAGES:
+            n = self.calls[s]
+            out[s] = {
+                "calls": n,
+                "avg_latency_s": round(self.seconds[s] / n, 2) if n else 0.0,
+                "tokens": self.tokens[s],
+            }
+        # Savings vs. sending every screened row through the full scorecard as well
+        if self.calls["full"]:
+            avg_full = self.tokens["full"] / self.calls["full"]
+            baseline = avg_full * (self.calls["full"] + self.screened_out)
+            out["est_tokens_saved"] = int(baseline - self.tokens["full"] - self.tokens["triage"])
+        return out
+
+    def format(self) -> str:
+        s = self.summary()
+        lines = [f"Cascade: {s['escalated']} escalated, {s['screened_out']} screened out"]
+        for stage in self.STAGES:
+            st = s[stage]
+            lines.append(f"  {stage:<6} calls={st['calls']} avg_latency={st['avg_latency_s']}s tokens={st['tokens']}")
+        if "est_tokens_saved" in s:
+            lines.append(f"  est. tokens saved vs. full-only run: {s['est_tokens_saved']}")
+        return "\n".join(lines)
+
+
+async def _call(stage: str, payload: dict, stats: EnrichStats | None) -> str:
+    started = time.monotonic()
+    resp = await create_response(payload)
+    if stats is not None:
+        stats.record(stage, time.monotonic() - started, resp)
+    return extract_output_text(resp)
+
+
+async def triage_one(user_obj: dict, stats: EnrichStats | None = None) -> dict | None:
+    """Cheap first-pass screen; returns None if the answer could not be parsed."""
+    payload = build_payload(
+        system_prompt=TRIAGE_PROMPT,
+        user_obj=user_obj,
+        schema=TRIAGE_SCHEMA,
+        model=TRIAGE_MODEL,
+        schema_name="Triage",
+    )
+    text = await _call("triage", payload, stats)
+    try:
+        return json.loads(text)
+    except Exception:
+        return None
+
+
+async def enrich_one(company_name: str, address: str, website: str | None, phone: str | None = None,
+                     cascade: bool = False, triage_threshold: int = 40, stats: EnrichStats | None = None) -> dict:
     user_obj = {
         "company_name": company_name,
         "address": address,
@@ -12,6 +82,26 @@ async def enrich_one(company_name: str, address: str, website: str | None, phone
         "phone": phone or "",
     }
 
+    triage = None
+    if cascade:
+        triage = await triage_one(user_obj, stats)
+        # Unparseable triage answers are escalated rather than dropped
+        if triage is not None and int(triage.get("score") or 0) < triage_threshold:
+            if stats is not None:
+                stats.screened_out += 1
+            return {
+                "company_type": triage.get("company_type"),
+                "relevance_dach": triage.get("relevance_dach"),
+                "observations": triage.get("observations", ""),
+                "recommendation": "no",
+                # Rough triage score is not comparable to full-scorecard totals
+                "score_total": None,
+                "triage_score": triage.get("score"),
+                "_stage": "triage",
+            }
+        if stats is not None:
+            stats.escalated += 1
+
     # No web scraping - rely purely on ChatGPT's knowledge
     payload = build_payload(
         system_prompt=SYSTEM_PROMPT,
@@ -20,9 +110,12 @@ async def enrich_one(company_name: str, address: str, website: str | None, phone
         extra_text_blocks=None,  # No additional context needed
     )
 
-    resp = await create_response(payload)
-    text = extract_output_text(resp)
+    text = await _call("full", payload, stats)
     try:
-        return json.loads(text)
+        data = json.loads(text)
     except Exception:
         return {"_raw": text, "company_name": company_name, "address": address, "website": website}
+    if cascade:
+        data["_stage"] = "full"
+        data["triage_score"] = triage.get("score") if triage else None
+    return data
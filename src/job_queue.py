@@ -0,0 +1,186 @@
+import os, time, fcntl, sqlite3
+from datetime import datetime
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+JOBS_DB_PATH = os.environ.get("JOBS_DB", str(ROOT_DIR / "data" / "jobs.sqlite3"))
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    input_path TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'queued',
+    total INTEGER NOT NULL DEFAULT 0,
+    done INTEGER NOT NULL DEFAULT 0,
+    submitted_by TEXT,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT,
+    output_ndjson TEXT,
+    output_csv TEXT,
+    error TEXT,
+    worker_id TEXT,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_pick ON jobs (status, priority DESC, id);
+"""
+
+
+# Columns added after the first release; ALTERed into older databases on connect
+_ADDED_COLUMNS = {"worker_id": "TEXT", "heartbeat_at": "REAL"}
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def connect(db_path: str | None = None) -> sqlite3.Connection:
+    """Open the job database, creating the schema on first use."""
+    path = db_path or JOBS_DB_PATH
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_SCHEMA)
+    existing = {r["name"] for r in conn.execute("PRAGMA table_info(jobs)")}
+    for name, decl in _ADDED_COLUMNS.items():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {decl}")
+    return conn
+
+
+def acquire_worker_lock(worker_id: str, db_path: str | None = None):
+    """Take the exclusive worker lock for a job database.
+
+    Only one worker may drain a queue, so the rate budget and request slots really are
+    global. Returns the open lock file (keep it open while serving; the OS releases the
+    lock when the process exits) or raises RuntimeError naming the current holder.
+    """
+    lock_path = f"{db_path or JOBS_DB_PATH}.lock"
+    Path(lock_path).parent.mkdir(parents=True, exist_ok=True)
+    f = open(lock_path, "a+", encoding="utf-8")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        f.seek(0)
+        holder = f.read().strip() or "unknown"
+        f.close()
+        raise RuntimeError(f"Another worker ({holder}) is already serving {db_path or JOBS_DB_PATH}")
+    f.truncate(0)
+    f.write(worker_id)
+    f.flush()
+    return f
+
+
+def submit(conn: sqlite3.Connection, input_path: str, priority: int = 0, submitted_by: str | None = None) -> int:
+    """Queue an input CSV for enrichment. Higher priority runs first; ties run in submission order."""
+    cur = conn.execute(
+        "INSERT INTO jobs (input_path, priority, status, submitted_by, created_at) VALUES (?, ?, ?, ?, ?)",
+        (str(input_path), int(priority), STATUS_QUEUED, submitted_by, _now()),
+    )
+    return int(cur.lastrowid)
+
+
+def claim_next(conn: sqlite3.Connection, worker_id: str) -> sqlite3.Row | None:
+    """Atomically move the highest-priority queued job to running under `worker_id` and return it."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            "SELECT * FROM jobs WHERE status = ? ORDER BY priority DESC, id LIMIT 1",
+            (STATUS_QUEUED,),
+        ).fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+        conn.execute(
+            "UPDATE jobs SET status = ?, started_at = ?, done = 0, worker_id = ?, heartbeat_at = ? WHERE id = ?",
+            (STATUS_RUNNING, _now(), worker_id, time.time(), row["id"]),
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return get(conn, row["id"])
+
+
+def heartbeat(conn: sqlite3.Connection, worker_id: str, job_ids) -> None:
+    """Mark the given jobs, which `worker_id` still has live tasks for, as alive."""
+    job_ids = list(job_ids)
+    if not job_ids:
+        return
+    marks = ",".join("?" * len(job_ids))
+    conn.execute(
+        f"UPDATE jobs SET heartbeat_at = ? WHERE status = ? AND worker_id = ? AND id IN ({marks})",
+        (time.time(), STATUS_RUNNING, worker_id, *job_ids),
+    )
+
+
+def requeue_stale(conn: sqlite3.Connection, stale_after_seconds: float) -> int:
+    """Put running jobs whose worker stopped sending heartbeats back on the queue."""
+    cur = conn.execute(
+        """
+        UPDATE jobs SET status = ?, started_at = NULL, done = 0, worker_id = NULL, heartbeat_at = NULL
+        WHERE status = ? AND (heartbeat_at IS NULL OR heartbeat_at < ?)
+        """,
+        (STATUS_QUEUED, STATUS_RUNNING, time.time() - stale_after_seconds),
+    )
+    return cur.rowcount
+
+
+def release_jobs(conn: sqlite3.Connection, worker_id: str, job_ids) -> int:
+    """Re-queue jobs a cleanly stopping worker cancelled before they finished."""
+    job_ids = list(job_ids)
+    if not job_ids:
+        return 0
+    marks = ",".join("?" * len(job_ids))
+    cur = conn.execute(
+        f"""
+        UPDATE jobs SET status = ?, started_at = NULL, done = 0, worker_id = NULL, heartbeat_at = NULL
+        WHERE status = ? AND worker_id = ? AND id IN ({marks})
+        """,
+        (STATUS_QUEUED, STATUS_RUNNING, worker_id, *job_ids),
+    )
+    return cur.rowcount
+
+
+def update_progress(conn: sqlite3.Connection, job_id: int, done: int, total: int) -> None:
+    conn.execute("UPDATE jobs SET done = ?, total = ? WHERE id = ?", (done, total, job_id))
+
+
+def mark_done(conn: sqlite3.Connection, job_id: int, output_ndjson: str, output_csv: str) -> None:
+    conn.execute(
+        "UPDATE jobs SET status = ?, finished_at = ?, output_ndjson = ?, output_csv = ? WHERE id = ?",
+        (STATUS_DONE, _now(), output_ndjson, output_csv, job_id),
+    )
+
+
+def mark_failed(conn: sqlite3.Connection, job_id: int, error: str) -> None:
+    conn.execute(
+        "UPDATE jobs SET status = ?, finished_at = ?, error = ? WHERE id = ?",
+        (STATUS_FAILED, _now(), error[:2000], job_id),
+    )
+
+
+def get(conn: sqlite3.Connection, job_id: int) -> sqlite3.Row | None:
+    return conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+
+def list_jobs(conn: sqlite3.Connection, limit: int = 100) -> list[dict]:
+    """Active jobs first (running, then queued by pick order), followed by the most recent finished ones."""
+    rows = conn.execute(
+        """
+        SELECT * FROM jobs
+        ORDER BY CASE status WHEN 'running' THEN 0 WHEN 'queued' THEN 1 ELSE 2 END,
+                 CASE WHEN status = 'queued' THEN -priority ELSE 0 END,
+                 CASE WHEN status IN ('done', 'failed') THEN -id ELSE id END
+        LIMIT ?
+        """,
+        (limit,),
+    ).fetchall()
+    return [dict(r) for r in rows]
@@ -1,10 +1,15 @@
-import os, json, asyncio, httpx
+import os, json, time, asyncio, httpx
 from dotenv import load_dotenv
 
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-5-mini")
+# Small, fast model used for the first-pass screen in cascade mode
+TRIAGE_MODEL = os.getenv("TRIAGE_MODEL", "gpt-5-nano")
 TIMEOUT = int(os.getenv("REQUEST_TIMEOUT_SECONDS", "40"))
+# Global request budget shared by every batch running in this process (0 = unlimited)
+RATE_LIMIT_RPM = int(os.getenv("RATE_LIMIT_RPM", "0"))
+MAX_CONNECTIONS = int(os.getenv("MAX_CONNECTIONS", "20"))
 
 OPENAI_URL = "https://api.openai.com/v1/chat/completions"
 
@@ -14,47 +19,98 @@ HEADERS = {
 }
 
 
+class RateLimiter:
+    """Spaces requests evenly so the whole process stays under `rpm` requests per minute."""
+
+    def __init__(self, rpm: int):
+        self.interval = 60.0 / rpm if rpm > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+_client: httpx.AsyncClient | None = None
+_limiter: RateLimiter | None = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the process-wide HTTP client so all batches share one connection pool."""
+    global _client
+    if _client is None or _client.is_closed:
+        timeout = httpx.Timeout(TIMEOUT, read=TIMEOUT, connect=TIMEOUT)
+        limits = httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS)
+        _client = httpx.AsyncClient(timeout=timeout, limits=limits)
+    return _client
+
+
+def get_rate_limiter() -> RateLimiter:
+    global _limiter
+    if _limiter is None:
+        _limiter = RateLimiter(RATE_LIMIT_RPM)
+    return _limiter
+
+
+async def aclose_client() -> None:
+    """Close the shared client; call once before the event loop shuts down."""
+    global _client, _limiter
+    if _client is not None:
+        await _client.aclose()
+    _client = None
+    _limiter = None
+
+
 async def create_response(payload: dict) -> dict:
     backoff_seconds = 2
-    timeout = httpx.Timeout(TIMEOUT, read=TIMEOUT, connect=TIMEOUT)
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        for attempt in range(6):
-            try:
-                r = await client.post(OPENAI_URL, headers=HEADERS, json=payload)
-            except (httpx.ReadTimeout, httpx.ConnectError) as e:
-                if attempt < 5:
-                    await asyncio.sleep(backoff_seconds)
-                    backoff_seconds *= 2
-                    continue
-                raise
-
-            # Retry on common transient status codes
-            if r.status_code in {429, 500, 502, 503, 504} and attempt < 5:
+    client = get_client()
+    limiter = get_rate_limiter()
+    for attempt in range(6):
+        await limiter.acquire()
+        try:
+            r = await client.post(OPENAI_URL, headers=HEADERS, json=payload)
+        except (httpx.ReadTimeout, httpx.ConnectError) as e:
+            if attempt < 5:
                 await asyncio.sleep(backoff_seconds)
                 backoff_seconds *= 2
                 continue
+            raise
+
+        # Retry on common transient status codes
+        if r.status_code in {429, 500, 502, 503, 504} and attempt < 5:
+            await asyncio.sleep(backoff_seconds)
+            backoff_seconds *= 2
+            continue
 
-            if r.status_code != 200:
-                print(f"OpenAI API Error {r.status_code}: {r.text}")
-            r.raise_for_status()
-            return r.json()
+        if r.status_code != 200:
+            print(f"OpenAI API Error {r.status_code}: {r.text}")
+        r.raise_for_status()
+        return r.json()
     raise RuntimeError("OpenAI request failed repeatedly")
 
 
-def build_payload(system_prompt: str, user_obj: dict, schema: dict, extra_text_blocks: list[str] | None = None) -> dict:
+def build_payload(system_prompt: str, user_obj: dict, schema: dict, extra_text_blocks: list[str] | None = None,
+                  model: str | None = None, schema_name: str = "Scorecard") -> dict:
     user_content = json.dumps(user_obj, ensure_ascii=False)
     if extra_text_blocks:
         user_content += "\n\n" + "\n\n".join(extra_text_blocks)
 
     return {
-        "model": OPENAI_MODEL,
+        "model": model or OPENAI_MODEL,
         "messages": [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_content},
         ],
         "response_format": {
             "type": "json_schema",
-            "json_schema": {"name": "Scorecard", "schema": schema, "strict": True},
+            "json_schema": {"name": schema_name, "schema": schema, "strict": True},
         },
     }
 
@@ -106,3 +106,17 @@ Guidance:
 * Never invent contact details; only report what is explicitly shown on the company’s official website.
 * Ensure the JSON is valid and parsable; no additional fields or deviations allowed.
   """
+
+TRIAGE_PROMPT = """
+You are screening companies in the DACH region (Germany, Austria, Switzerland) for a specialist buyer/reseller of used industrial & production machinery.
+Return ONLY JSON that STRICTLY matches the provided schema.
+
+Based ONLY on the provided company_name, address, and website URL (if given), quickly estimate:
+
+* company_type: manufacturer|producer|dealer|distributor|service_provider|other
+* relevance_dach: high|medium|low — how relevant they are as a source of used machinery in DACH
+* score: 0-100 — rough overall potential, using the same yardstick as a full assessment (how much machinery they likely run internally, how likely they dispose of used equipment, DACH accessibility)
+* observations: one short sentence justifying the score
+
+Be conservative when information is minimal. Do not list contacts or write outreach text.
+"""
@@ -0,0 +1,118 @@
+import json
+from pathlib import Path
+from .schema import SCORECARD_SCHEMA
+
+ROLLUP_VERSION = 1
+ROLLUP_SUFFIX = ".rollup.json"
+# Categorical fields are whatever the scorecard schema declares as enums
+ENUM_FIELDS = tuple(k for k, v in SCORECARD_SCHEMA["properties"].items() if "enum" in v)
+LIST_FIELDS = ("machine_types", "industry_focus", "regions_served")
+SCORE_BUCKET = 10
+
+
+def empty_rollup() -> dict:
+    return {
+        "version": ROLLUP_VERSION,
+        "count": 0,
+        "raw": 0,
+        "score_count": 0,
+        "score_sum": 0,
+        "score_histogram": {},
+        "enums": {f: {} for f in ENUM_FIELDS},
+        "lists": {f: {} for f in LIST_FIELDS},
+        "stages": {},
+    }
+
+
+def _score(rec: dict):
+    score = rec.get("score_total")
+    if score is None:
+        sb = rec.get("score_breakdown") or {}
+        if isinstance(sb, dict):
+            score = sb.get("total")
+    return score if isinstance(score, (int, float)) and not isinstance(score, bool) else None
+
+
+def _bump(counts: dict, key, n: int = 1) -> None:
+    counts[key] = counts.get(key, 0) + n
+
+
+def add_record(rollup: dict, rec: dict) -> None:
+    """Fold one enrichment record into `rollup` in place."""
+    rollup["count"] += 1
+    if "_raw" in rec:
+        rollup["raw"] += 1
+        return
+    score = _score(rec)
+    if score is not None:
+        rollup["score_count"] += 1
+        rollup["score_sum"] += score
+        bucket = min(max(int(score) // SCORE_BUCKET * SCORE_BUCKET, 0), 100)
+        _bump(rollup["score_histogram"], str(bucket))
+    derived = rec.get("derived") or {}
+    for f in ENUM_FIELDS:
+        value = rec.get(f) or derived.get(f)
+        if value:
+            _bump(rollup["enums"][f], value)
+    for f in LIST_FIELDS:
+        for item in rec.get(f) or derived.get(f) or []:
+            item = str(item).strip()
+            if item:
+                _bump(rollup["lists"][f], item)
+    if rec.get("_stage"):
+        _bump(rollup["stages"], rec["_stage"])
+
+
+def build_rollup(records) -> dict:
+    rollup = empty_rollup()
+    for rec in records:
+        add_record(rollup, rec)
+    return rollup
+
+
+def merge_rollups(rollups) -> dict:
+    """Combine per-batch rollups; every field is a count or sum, so merging is exact."""
+    out = empty_rollup()
+    for r in rollups:
+        for k in ("count", "raw", "score_count", "score_sum"):
+            out[k] += r.get(k, 0)
+        for key, n in r.get("score_histogram", {}).items():
+            _bump(out["score_histogram"], key, n)
+        for group in ("enums", "lists"):
+            for f, counts in r.get(group, {}).items():
+                target = out[group].setdefault(f, {})
+                for key, n in counts.items():
+                    _bump(target, key, n)
+        for key, n in r.get("stages", {}).items():
+            _bump(out["stages"], key, n)
+    return out
+
+
+def summarize(rollup: dict) -> dict:
+    """Headline numbers for the dashboard cards."""
+    reco = rollup["enums"].get("recommendation", {})
+    return {
+        "total_companies": rollup["count"],
+        "high_priority": reco.get("yes", 0),
+        "medium_priority": reco.get("maybe", 0),
+        "low_priority": reco.get("no", 0),
+        "avg_score": round(rollup["score_sum"] / rollup["score_count"], 1) if rollup["score_count"] else 0,
+        # Raw inputs of avg_score, so live updates can extend the same average
+        "score_sum": rollup["score_sum"],
+        "score_count": rollup["score_count"],
+    }
+
+
+def rollup_path_for(ndjson_path) -> Path:
+    p = Path(ndjson_path)
+    return p.with_name(p.stem + ROLLUP_SUFFIX)
+
+
+def write_rollup(path, rollup: dict) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(rollup, f, ensure_ascii=False)
+
+
+def read_rollup(path) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
@@ -1,10 +1,12 @@
-import os, asyncio, json, shutil
+import os, asyncio, json
 from datetime import datetime
 from pathlib import Path
 import pandas as pd
 from dotenv import load_dotenv
 from tqdm import tqdm
-from .enrich import enrich_one
+from .enrich import enrich_one, EnrichStats
+from .openai_client import aclose_client
+from .rollup import build_rollup, rollup_path_for, write_rollup
 
 load_dotenv()
 
@@ -15,10 +17,16 @@ INPUT_DIR = DATA_DIR / "input"
 OUTPUT_DIR = DATA_DIR / "output"
 OUTPUT_DASHBOARD_DIR = OUTPUT_DIR / "dashboard"
 OUTPUT_TABLE_DIR = OUTPUT_DIR / "table"
+# In-progress NDJSON is appended here row by row so the dashboard can tail it live
+OUTPUT_LIVE_DIR = OUTPUT_DIR / "live"
+# Partial NDJSON of batches that failed or were cancelled, kept out of the live view
+OUTPUT_FAILED_DIR = OUTPUT_DIR / "failed"
 INPUT_DIR.mkdir(parents=True, exist_ok=True)
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 OUTPUT_DASHBOARD_DIR.mkdir(parents=True, exist_ok=True)
 OUTPUT_TABLE_DIR.mkdir(parents=True, exist_ok=True)
+OUTPUT_LIVE_DIR.mkdir(parents=True, exist_ok=True)
+OUTPUT_FAILED_DIR.mkdir(parents=True, exist_ok=True)
 
 INPUT_PATH = os.environ.get("INPUT_PATH", str(INPUT_DIR / "input.csv"))
 OUTPUT_CSV_ENV = os.environ.get("OUTPUT_CSV")
@@ -26,6 +34,9 @@ OUTPUT_NDJSON_ENV = os.environ.get("OUTPUT_NDJSON")
 ARCHIVE_CSV_PATH = os.environ.get("ARCHIVE_CSV")  # optional global append CSV
 ARCHIVE_NDJSON_PATH = os.environ.get("ARCHIVE_NDJSON")  # optional global append NDJSON
 CONCURRENCY = int(os.environ.get("CONCURRENCY", "5"))
+# Two-stage mode: screen every row with TRIAGE_MODEL, full scorecard only at/above the threshold
+CASCADE = os.environ.get("CASCADE", "0").lower() in {"1", "true", "yes"}
+TRIAGE_THRESHOLD = int(os.environ.get("TRIAGE_THRESHOLD", "40"))
 
 
 def _normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
@@ -119,9 +130,12 @@ def read_input(path: str) -> pd.DataFrame:
     return _normalize_columns(df)
 
 
-async def worker(row, results, sem):
+async def worker(row, results, sem, stats=None):
     async with sem:
-        data = await enrich_one(row["company_name"], row["address"], row.get("website"), row.get("phone"))
+        data = await enrich_one(
+            row["company_name"], row["address"], row.get("website"), row.get("phone"),
+            cascade=CASCADE, triage_threshold=TRIAGE_THRESHOLD, stats=stats,
+        )
         # Attach input fields for downstream outputs
         data["company_name"] = row.get("company_name", "")
         data["address"] = row.get("address", "")
@@ -147,28 +161,74 @@ async def worker(row, results, sem):
         results.append(data)
 
 
-async def run():
-    df = read_input(INPUT_PATH)
+async def run(input_path: str | None = None, sem=None,
+              on_progress=None, batch_name: str | None = None) -> dict:
+    """Enrich one input file and write its per-batch and archive outputs.
+
+    `sem` is any async context manager guarding one request; the job service passes a
+    priority slot on its process-wide limiter so several batches share one budget.
+    Rows are pulled by at most CONCURRENCY workers per batch, so a large batch never
+    queues more than that many requests ahead of other jobs.
+    `on_progress(done, total)` is called after every row.
+    """
+    input_path = input_path or INPUT_PATH
+    df = read_input(input_path)
+    if on_progress is not None:
+        # Report the row count up front so queued/running jobs don't show 0/0
+        on_progress(0, len(df))
 
     # Derive output filenames from input path when not explicitly set via env
-    in_stem = os.path.splitext(os.path.basename(INPUT_PATH))[0]
+    in_stem = os.path.splitext(os.path.basename(input_path))[0]
     ts = datetime.now().strftime("%Y%m%d-%H%M%S")
+    out_stem = batch_name or f"{in_stem}__{ts}"
     # Always write outputs under data/output/ unless explicitly overridden by env
-    out_csv_path = OUTPUT_CSV_ENV or str(OUTPUT_DIR / f"{in_stem}__{ts}.csv")
-    out_ndjson_path = OUTPUT_NDJSON_ENV or str(OUTPUT_DIR / f"{in_stem}__{ts}.ndjson")
+    out_csv_path = OUTPUT_CSV_ENV or str(OUTPUT_DIR / f"{out_stem}.csv")
+    out_ndjson_path = OUTPUT_NDJSON_ENV or str(OUTPUT_LIVE_DIR / f"{out_stem}.ndjson")
     # Archive (append-across-batches) files always under data/output/
     archive_csv_path = ARCHIVE_CSV_PATH or str(OUTPUT_DIR / "all_batches.csv")
     archive_ndjson_path = ARCHIVE_NDJSON_PATH or str(OUTPUT_DIR / "all_batches.ndjson")
-    sem = asyncio.Semaphore(CONCURRENCY)
-    tasks, results = [], []
-    for _, row in df.iterrows():
-        tasks.append(asyncio.create_task(worker(row, results, sem)))
-    for t in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="Enriching"):
-        await t
-
-    with open(out_ndjson_path, "w", encoding="utf-8") as f:
-        for r in results:
-            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+    sem = sem or asyncio.Semaphore(CONCURRENCY)
+    stats = EnrichStats()
+    results = []
+    total = len(df)
+    pending_rows = (row for _, row in df.iterrows())
+    done = written = 0
+    try:
+        with open(out_ndjson_path, "w", encoding="utf-8") as f, \
+                tqdm(total=total, desc="Enriching", disable=on_progress is not None) as bar:
+
+            async def pump():
+                nonlocal done, written
+                # Shared generator: each worker takes the next row when it is free
+                for row in pending_rows:
+                    await worker(row, results, sem, stats)
+                    done += 1
+                    bar.update(1)
+                    # Write each finished row immediately (whole lines only) for live tailing
+                    for r in results[written:]:
+                        f.write(json.dumps(r, ensure_ascii=False) + "\n")
+                    written = len(results)
+                    f.flush()
+                    if on_progress is not None:
+                        on_progress(done, total)
+
+            tasks = [asyncio.create_task(pump()) for _ in range(min(CONCURRENCY, total))]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                # Don't leave the remaining rows calling the API (and holding `sem`) for a failed batch
+                for t in tasks:
+                    t.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+    except BaseException:
+        # Failed/cancelled batch: take the partial file out of live/ so it isn't shown forever
+        if Path(out_ndjson_path).parent == OUTPUT_LIVE_DIR:
+            try:
+                os.replace(out_ndjson_path, OUTPUT_FAILED_DIR / os.path.basename(out_ndjson_path))
+            except OSError:
+                pass
+        raise
     # Append to archive NDJSON (with batch metadata), creating if needed
     try:
         with open(archive_ndjson_path, "a", encoding="utf-8") as f:
@@ -208,6 +268,7 @@ async def run():
                 "contact_1_url": None,
                 "contact_count": None,
                 "sources": None,
+                "stage": r.get("_stage"),
                 "raw": r["_raw"][:1000],
             })
             continue
@@ -248,6 +309,7 @@ async def run():
             "contact_1_url": c1.get("page_url"),
             "contact_count": len(contacts),
             "sources": "; ".join(r.get("sources", [])),
+            "stage": r.get("_stage"),
         })
 
     out_df = pd.DataFrame(rows)
@@ -264,13 +326,24 @@ async def run():
     except Exception:
         pass
 
+    # Per-batch aggregates next to the NDJSON so the dashboard never rescans rows for stats
+    rollup_path = rollup_path_for(out_ndjson_path)
+    try:
+        write_rollup(rollup_path, build_rollup(results))
+    except Exception as e:
+        print(f"Warning: failed writing rollup {rollup_path}: {e}")
+
     # Move per-batch files into their designated subfolders for the dashboard/table
     try:
         dash_target = OUTPUT_DASHBOARD_DIR / os.path.basename(out_ndjson_path)
         table_target = OUTPUT_TABLE_DIR / os.path.basename(out_csv_path)
-        # Use replace to move/overwrite if same-named file exists from prior runs
-        shutil.replace(out_ndjson_path, dash_target)
-        shutil.replace(out_csv_path, table_target)
+        # Use replace to move/overwrite if same-named file exists from prior runs;
+        # the rollup goes first so the dashboard never sees a batch without one
+        if rollup_path.exists():
+            os.replace(rollup_path, rollup_path_for(dash_target))
+            rollup_path = rollup_path_for(dash_target)
+        os.replace(out_ndjson_path, dash_target)
+        os.replace(out_csv_path, table_target)
         out_ndjson_path = str(dash_target)
         out_csv_path = str(table_target)
     except Exception:
@@ -278,10 +351,20 @@ async def run():
         pass
 
     print(
-        f"Wrote {out_ndjson_path} and {out_csv_path}\n"
+        f"Wrote {out_ndjson_path}, {out_csv_path} and {rollup_path.name}\n"
         f"Appended to {archive_ndjson_path} and {archive_csv_path}"
     )
+    if CASCADE:
+        print(stats.format())
+    return {"ndjson": out_ndjson_path, "csv": out_csv_path, "rows": len(results), "stats": stats.summary()}
+
+
+async def main():
+    try:
+        await run()
+    finally:
+        await aclose_client()
 
 
 if __name__ == "__main__":
-    asyncio.run(run())
+    asyncio.run(main())
@@ -55,3 +55,19 @@ SCORECARD_SCHEMA = {
     "contact_persons","contact_person_notes","sources"
   ]
 }
+
+# Reduced schema for the cheap first-pass screen in cascade mode
+TRIAGE_SCHEMA = {
+  "type": "object",
+  "additionalProperties": False,
+  "properties": {
+    "company_type": {
+      "type": "string",
+      "enum": ["manufacturer", "producer", "dealer", "distributor", "service_provider", "other"]
+    },
+    "relevance_dach": {"type": "string", "enum": ["high", "medium", "low"]},
+    "score": {"type": "integer"},
+    "observations": {"type": "string"}
+  },
+  "required": ["company_type", "relevance_dach", "score", "observations"]
+}
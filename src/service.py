@@ -0,0 +1,191 @@
+import os, sys, time, heapq, socket, asyncio, argparse, getpass, itertools
+from pathlib import Path
+from dotenv import load_dotenv
+from . import job_queue
+from .openai_client import aclose_client
+from .run_batch import run, CONCURRENCY
+
+load_dotenv()
+
+# How many queued jobs may run side by side; they all share CONCURRENCY in-flight requests
+SERVICE_JOB_SLOTS = int(os.environ.get("SERVICE_JOB_SLOTS", "2"))
+SERVICE_POLL_SECONDS = float(os.environ.get("SERVICE_POLL_SECONDS", "2"))
+PROGRESS_INTERVAL_SECONDS = 1.0
+# Running jobs whose worker hasn't sent a heartbeat for this long are re-queued
+HEARTBEAT_STALE_SECONDS = float(os.environ.get("HEARTBEAT_STALE_SECONDS", "60"))
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class PrioritySlots:
+    """Process-wide request limit whose waiters are served highest priority first.
+
+    Ties are served in arrival order, so jobs of equal priority interleave row by row.
+    """
+
+    def __init__(self, limit: int):
+        self._free = limit
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+
+    async def acquire(self, priority: int) -> None:
+        if self._free > 0 and not self._waiters:
+            self._free -= 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (-priority, next(self._order), fut))
+        try:
+            await fut
+        except asyncio.CancelledError:
+            # The slot may have been handed over just as we were cancelled
+            if fut.done() and not fut.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self._free += 1
+
+    def at(self, priority: int) -> "_Slot":
+        """Async context manager taking one slot at `priority`."""
+        return _Slot(self, priority)
+
+
+class _Slot:
+    def __init__(self, slots: PrioritySlots, priority: int):
+        self._slots = slots
+        self._priority = priority
+
+    async def __aenter__(self):
+        await self._slots.acquire(self._priority)
+
+    async def __aexit__(self, *exc):
+        self._slots.release()
+
+
+async def _run_job(conn, job, slots: PrioritySlots) -> None:
+    job_id = job["id"]
+    last_write = 0.0
+
+    def on_progress(done: int, total: int) -> None:
+        nonlocal last_write
+        now = time.monotonic()
+        # Throttle SQLite writes; always record the final row
+        if done == total or now - last_write >= PROGRESS_INTERVAL_SECONDS:
+            job_queue.update_progress(conn, job_id, done, total)
+            last_write = now
+
+    stem = os.path.splitext(os.path.basename(job["input_path"]))[0]
+    print(f"Job {job_id}: starting {job['input_path']} (priority {job['priority']})")
+    try:
+        out = await run(job["input_path"], sem=slots.at(job["priority"]), on_progress=on_progress,
+                        batch_name=f"{stem}__job{job_id}")
+    except Exception as e:
+        job_queue.mark_failed(conn, job_id, f"{type(e).__name__}: {e}")
+        print(f"Job {job_id}: failed: {e}")
+        return
+    job_queue.mark_done(conn, job_id, out["ndjson"], out["csv"])
+    print(f"Job {job_id}: done ({out['rows']} rows)")
+
+
+def _check_finished(conn, task: asyncio.Task, job_id: int) -> None:
+    """Fail a job whose task died outside run() (e.g. the DB was locked while marking it done)."""
+    if task.cancelled() or task.exception() is None:
+        return
+    e = task.exception()
+    print(f"Job {job_id}: worker task crashed: {type(e).__name__}: {e}")
+    try:
+        job_queue.mark_failed(conn, job_id, f"{type(e).__name__}: {e}")
+    except Exception as mark_error:
+        # Left 'running' without heartbeats, so it is re-queued once it goes stale
+        print(f"Job {job_id}: could not record failure: {mark_error}")
+
+
+async def serve(slots: int = SERVICE_JOB_SLOTS, poll_seconds: float = SERVICE_POLL_SECONDS) -> None:
+    """Resident worker: pulls jobs by priority and runs them through one shared HTTP pool and rate budget.
+
+    Only one worker may serve a job database at a time; the budget is per process, so a
+    second worker would double it.
+    """
+    lock = job_queue.acquire_worker_lock(WORKER_ID)
+    conn = job_queue.connect()
+    request_slots = PrioritySlots(CONCURRENCY)
+    running: dict[asyncio.Task, int] = {}  # task -> job id
+    print(f"Enrichment service {WORKER_ID} started ({slots} job slot(s), {CONCURRENCY} concurrent requests)")
+    try:
+        while True:
+            # Keep our jobs alive; re-queue jobs left running by a previous, crashed worker
+            job_queue.heartbeat(conn, WORKER_ID, running.values())
+            requeued = job_queue.requeue_stale(conn, HEARTBEAT_STALE_SECONDS)
+            if requeued:
+                print(f"Re-queued {requeued} job(s) from stale worker(s)")
+            while len(running) < slots:
+                job = job_queue.claim_next(conn, WORKER_ID)
+                if job is None:
+                    break
+                running[asyncio.create_task(_run_job(conn, job, request_slots))] = job["id"]
+            if running:
+                finished, _ = await asyncio.wait(running, timeout=poll_seconds, return_when=asyncio.FIRST_COMPLETED)
+                for t in finished:
+                    job_id = running.pop(t)
+                    _check_finished(conn, t, job_id)
+            else:
+                await asyncio.sleep(poll_seconds)
+    finally:
+        for t in running:
+            t.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        released = job_queue.release_jobs(conn, WORKER_ID, running.values())
+        if released:
+            print(f"Re-queued {released} unfinished job(s)")
+        await aclose_client()
+        conn.close()
+        lock.close()
+
+
+def _print_jobs(jobs: list[dict]) -> None:
+    if not jobs:
+        print("No jobs.")
+        return
+    for j in jobs:
+        progress = f"{j['done']}/{j['total']}" if j["total"] else "-"
+        print(f"#{j['id']:<5} {j['status']:<8} prio={j['priority']:<3} {progress:<12} {j['input_path']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Enrichment job service")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_serve = sub.add_parser("serve", help="run the resident worker")
+    p_serve.add_argument("--slots", type=int, default=SERVICE_JOB_SLOTS, help="jobs to run side by side")
+
+    p_submit = sub.add_parser("submit", help="queue an input CSV")
+    p_submit.add_argument("input_path")
+    p_submit.add_argument("--priority", type=int, default=0, help="higher runs first (default 0)")
+
+    sub.add_parser("list", help="show queued, running and recent jobs")
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        try:
+            asyncio.run(serve(slots=args.slots))
+        except KeyboardInterrupt:
+            print("Service stopped.")
+        except RuntimeError as e:
+            sys.exit(str(e))
+    elif args.command == "submit":
+        path = Path(args.input_path).expanduser().resolve()
+        if not path.is_file():
+            parser.error(f"input file not found: {path}")
+        conn = job_queue.connect()
+        job_id = job_queue.submit(conn, str(path), priority=args.priority, submitted_by=getpass.getuser())
+        print(f"Queued job {job_id} for {path}")
+    elif args.command == "list":
+        _print_jobs(job_queue.list_jobs(job_queue.connect()))
+
+
+if __name__ == "__main__":
+    main()
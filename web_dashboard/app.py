@@ -1,18 +1,35 @@
-from flask import Flask, render_template, jsonify
+from flask import Flask, render_template, jsonify, request, redirect, url_for, Response, stream_with_context
+from werkzeug.utils import secure_filename
+from datetime import datetime
+from bisect import bisect_right
 import json
+import threading
+import time
 import pandas as pd
 import os
+import sys
 from pathlib import Path
 from typing import List
 
-app = Flask(__name__)
-
 # Path to data files
 ROOT_DIR = Path(__file__).parent.parent
 DATA_DIR = ROOT_DIR / "data"
+UPLOAD_DIR = DATA_DIR / "input" / "uploads"
+
+# Make the enrichment package importable when the app is started from web_dashboard/
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+from src import job_queue
+from src.rollup import build_rollup, merge_rollups, read_rollup, rollup_path_for, summarize
+
+app = Flask(__name__)
 # Fixed locations for batch outputs
 DASHBOARD_DIR = DATA_DIR / "output" / "dashboard"
 TABLE_DIR = DATA_DIR / "output" / "table"
+# In-progress batches append here; files move to DASHBOARD_DIR when the batch finishes
+LIVE_DIR = DATA_DIR / "output" / "live"
+STREAM_POLL_SECONDS = 1.0
+STREAM_KEEPALIVE_SECONDS = 15.0
 
 def _glob_sorted(paths: List[Path]) -> List[Path]:
     return sorted([p for p in paths if p.is_file()], key=lambda p: p.stat().st_mtime)
@@ -51,6 +68,150 @@ def _get_csv_dirs() -> List[Path]:
             seen.add(str(d))
     return out
 
+class LiveTail:
+    """Incrementally tails in-progress NDJSON files, keeping a byte offset per file.
+
+    Only bytes appended since the last poll are read, and only up to the last complete
+    line. Each record is keyed by the byte offset just past its line, so a stream cursor
+    ({file name: offset}) means the same thing in every worker process and across
+    restarts. Records of files that leave the directory (finished batches) are dropped;
+    the regular loader picks them up from DASHBOARD_DIR.
+    """
+
+    def __init__(self, directory: Path, min_interval: float = 0.5):
+        self.directory = directory
+        self.min_interval = min_interval
+        self._offsets: dict[str, int] = {}
+        self._records: dict[str, list[tuple[int, dict]]] = {}
+        self._last_poll = 0.0
+        self._lock = threading.Lock()
+
+    def _forget(self, names) -> None:
+        for name in names:
+            self._offsets.pop(name, None)
+            self._records.pop(name, None)
+
+    def poll(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_poll < self.min_interval:
+                return
+            self._last_poll = now
+            present = {p.name: p for p in self.directory.glob("*.ndjson")} if self.directory.is_dir() else {}
+            gone = set(self._offsets) - set(present)
+            if gone:
+                self._forget(gone)
+            for name, p in sorted(present.items()):
+                offset = self._offsets.get(name, 0)
+                try:
+                    size = p.stat().st_size
+                    if size < offset:
+                        # File was rewritten; start over
+                        self._forget({name})
+                        offset = 0
+                    if size == offset:
+                        continue
+                    with open(p, 'rb') as f:
+                        f.seek(offset)
+                        chunk = f.read(size - offset)
+                except FileNotFoundError:
+                    continue
+                end = chunk.rfind(b"\n")
+                if end < 0:
+                    continue
+                records = self._records.setdefault(name, [])
+                pos = offset
+                for line in chunk[:end + 1].splitlines(keepends=True):
+                    pos += len(line)
+                    if not line.strip():
+                        continue
+                    try:
+                        obj = json.loads(line)
+                    except ValueError as e:
+                        print(f"Warning: bad live line in {p}: {e}")
+                        continue
+                    obj["_batch_file"] = name
+                    obj["_live"] = True
+                    records.append((pos, obj))
+                self._offsets[name] = offset + end + 1
+
+    def since(self, cursor: dict[str, int]) -> list[tuple[dict[str, int], dict]]:
+        """Records after `cursor`, each paired with the cursor to resume from once it is delivered."""
+        self.poll()
+        with self._lock:
+            # Finished batches leave the live view; stop carrying their offsets
+            cursor = {name: off for name, off in cursor.items() if name in self._records}
+            out = []
+            for name in sorted(self._records):
+                start = cursor.get(name, 0)
+                if start > self._offsets[name]:
+                    try:
+                        rewritten = start > (self.directory / name).stat().st_size
+                    except FileNotFoundError:
+                        continue
+                    if not rewritten:
+                        # Another process has read further; our next poll will catch up
+                        continue
+                    start = 0
+                records = self._records[name]
+                for pos, rec in records[bisect_right(records, start, key=lambda r: r[0]):]:
+                    cursor = {**cursor, name: pos}
+                    out.append((cursor, rec))
+            return out
+
+
+def _parse_cursor(raw: str | None) -> dict[str, int]:
+    """Decode an SSE event id / ?since= value produced by api_stream."""
+    try:
+        value = json.loads(raw) if raw else {}
+    except ValueError:
+        return {}
+    if not isinstance(value, dict):
+        return {}
+    return {str(k): v for k, v in value.items() if isinstance(v, int) and v >= 0}
+
+
+live_tail = LiveTail(LIVE_DIR)
+
+# ndjson path -> ((ndjson mtime, rollup mtime), rollup); avoids re-reading unchanged batches
+_rollup_cache: dict[Path, tuple[tuple, dict]] = {}
+# Request threads (gthread workers) read and prune the cache concurrently
+_rollup_cache_lock = threading.Lock()
+
+def _batch_rollup(p: Path) -> dict:
+    """Rollup for one batch: its .rollup.json if present, else built once from the NDJSON (older batches)."""
+    rp = rollup_path_for(p)
+    sig = (p.stat().st_mtime, rp.stat().st_mtime if rp.exists() else None)
+    with _rollup_cache_lock:
+        cached = _rollup_cache.get(p)
+    if cached and cached[0] == sig:
+        return cached[1]
+    if rp.exists():
+        rollup = read_rollup(rp)
+    else:
+        with open(p, 'r', encoding='utf-8') as f:
+            rollup = build_rollup(json.loads(line) for line in f if line.strip())
+    with _rollup_cache_lock:
+        _rollup_cache[p] = (sig, rollup)
+    return rollup
+
+def load_rollup() -> dict:
+    """Merged aggregates across all batches, in O(number of batches)."""
+    rollups = []
+    ndjson_files: List[Path] = []
+    for d in _get_ndjson_dirs():
+        ndjson_files += list(d.rglob("*.ndjson"))
+    ndjson_files = _glob_sorted(ndjson_files)
+    for p in ndjson_files:
+        try:
+            rollups.append(_batch_rollup(p))
+        except Exception as e:
+            print(f"Warning: failed loading rollup for {p}: {e}")
+    with _rollup_cache_lock:
+        for stale in set(_rollup_cache) - set(ndjson_files):
+            _rollup_cache.pop(stale, None)
+    return merge_rollups(rollups)
+
 def load_enrichment_data():
     """Load and aggregate ALL enrichment results in data/ (multiple batches)."""
     try:
@@ -101,14 +262,8 @@ def dashboard():
     """Main dashboard page"""
     detailed_data, summary_data = load_enrichment_data()
     
-    # Calculate summary statistics
-    stats = {
-        'total_companies': len(detailed_data),
-        'high_priority': len([d for d in detailed_data if d.get('recommendation') == 'yes']),
-        'medium_priority': len([d for d in detailed_data if d.get('recommendation') == 'maybe']),
-        'low_priority': len([d for d in detailed_data if d.get('recommendation') == 'no']),
-        'avg_score': round(sum(d.get('score_total', 0) for d in detailed_data) / len(detailed_data) if detailed_data else 0, 1)
-    }
+    # Summary statistics come from the per-batch rollups, not a scan of detailed_data
+    stats = summarize(load_rollup())
     
     return render_template('dashboard.html', 
                          companies=detailed_data, 
@@ -157,6 +312,35 @@ def api_companies():
     detailed_data, _ = load_enrichment_data()
     return jsonify(detailed_data)
 
+@app.route('/api/stats')
+def api_stats():
+    """API endpoint for aggregates: headline stats plus score histogram and enum/list counts"""
+    rollup = load_rollup()
+    return jsonify({'stats': summarize(rollup), 'rollup': rollup})
+
+@app.route('/api/stream')
+def api_stream():
+    """Server-Sent Events: push records from in-progress batches as they are written."""
+    # Event ids are the cursor itself ({batch file: byte offset}), valid on any worker
+    cursor = _parse_cursor(request.headers.get('Last-Event-ID') or request.args.get('since'))
+
+    def events():
+        nonlocal cursor
+        last_sent = time.monotonic()
+        while True:
+            for next_cursor, rec in live_tail.since(cursor):
+                event_id = json.dumps(next_cursor, separators=(',', ':'))
+                yield f"id: {event_id}\nevent: company\ndata: {json.dumps(rec, ensure_ascii=False)}\n\n"
+                cursor = next_cursor
+                last_sent = time.monotonic()
+            if time.monotonic() - last_sent >= STREAM_KEEPALIVE_SECONDS:
+                yield ": keepalive\n\n"
+                last_sent = time.monotonic()
+            time.sleep(STREAM_POLL_SECONDS)
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/company/<int:company_id>')
 def company_detail(company_id):
     """Detailed view of a specific company"""
@@ -168,5 +352,47 @@ def company_detail(company_id):
     else:
         return "Company not found", 404
 
+@app.route('/jobs')
+def jobs_view():
+    """Job queue: upload a CSV for the enrichment service and watch per-job progress."""
+    conn = job_queue.connect()
+    try:
+        jobs = job_queue.list_jobs(conn)
+    finally:
+        conn.close()
+    return render_template('jobs.html', jobs=jobs)
+
+@app.route('/jobs/upload', methods=['POST'])
+def jobs_upload():
+    """Store an uploaded CSV under data/input/uploads and queue it."""
+    f = request.files.get('file')
+    if f is None or not f.filename:
+        return "No file uploaded", 400
+    name = secure_filename(f.filename)
+    if not name.lower().endswith('.csv'):
+        return "Only .csv files are supported", 400
+    try:
+        priority = int(request.form.get('priority', 0) or 0)
+    except ValueError:
+        return "Priority must be an integer", 400
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    target = UPLOAD_DIR / f"{datetime.now().strftime('%Y%m%d-%H%M%S')}__{name}"
+    f.save(target)
+    conn = job_queue.connect()
+    try:
+        job_queue.submit(conn, str(target), priority=priority, submitted_by=request.remote_addr)
+    finally:
+        conn.close()
+    return redirect(url_for('jobs_view'))
+
+@app.route('/api/jobs')
+def api_jobs():
+    """API endpoint for job queue state and progress"""
+    conn = job_queue.connect()
+    try:
+        return jsonify(job_queue.list_jobs(conn))
+    finally:
+        conn.close()
+
 if __name__ == '__main__':
     app.run(debug=True, host='127.0.0.1', port=8080)